@@ -7,16 +7,28 @@ import pandas as pd
 import base64
 import time
 import re
+import string
+import functools
 import json
 import random
 import os
-from datetime import datetime, timedelta
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+from email.header import Header
+from email.utils import make_msgid
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+import google_auth_httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 # ========================================
 # Streamlit Page Setup
@@ -68,6 +80,16 @@ CLIENT_CONFIG = {
 DONE_FILE = "/tmp/mailmerge_done.json"
 BATCH_SIZE_DEFAULT = 50
 DRAFT_BATCH_SIZE_DEFAULT = 110  # default batch for draft mode
+SEND_CHUNK_SIZE = 20  # Gmail calls per HTTP batch request (kept well under the 100 limit)
+SEND_CONCURRENCY = 10  # max in-flight async sends
+GMAIL_SEND_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+MESSAGE_ID_DOMAIN = "mailmerge.local"
+BATCH_MODIFY_MAX_IDS = 1000  # Gmail's per-call limit for messages.batchModify
+TOKEN_REFRESH_SKEW = timedelta(minutes=5)
+GMAIL_MAX_ATTEMPTS = 5
+RETRYABLE_STATUSES = {429, 500, 502, 503}
+# A 504 on a send/draft often means it went through, so only idempotent reads retry it
+READ_RETRYABLE_STATUSES = RETRYABLE_STATUSES | {504}
 
 # ========================================
 # Predefined Follow-up Templates (added)
@@ -127,10 +149,15 @@ if os.path.exists(DONE_FILE) and not st.session_state.get("done", False):
             done_info = json.load(f)
         file_path = done_info.get("file")
         if file_path and os.path.exists(file_path):
+            # Read the file once per session; download buttons re-render on every rerun
+            if st.session_state.get("last_saved_path") != file_path:
+                with open(file_path, "rb") as f:
+                    st.session_state["last_saved_bytes"] = f.read()
+                st.session_state["last_saved_path"] = file_path
             st.success("✅ Previous mail merge completed successfully.")
             st.download_button(
                 "⬇️ Download Updated CSV",
-                data=open(file_path, "rb"),
+                data=st.session_state["last_saved_bytes"],
                 file_name=os.path.basename(file_path),
                 mime="text/csv",
             )
@@ -146,75 +173,339 @@ if os.path.exists(DONE_FILE) and not st.session_state.get("done", False):
 # Helpers
 # ========================================
 EMAIL_REGEX = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
-
-def extract_email(value: str):
-    if not value:
-        return None
-    match = EMAIL_REGEX.search(str(value))
-    return match.group(0) if match else None
+BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+LINK_RE = re.compile(r"\[(.*?)\]\((https?://[^\s)]+)\)")
+
+def extract_emails(values):
+    """First address found in each cell of `values`, NaN where there is none."""
+    return values.astype(str).str.strip().str.extract(f"({EMAIL_REGEX.pattern})", expand=False)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def email_index(upload_key, _df):
+    """Lower-cased Email -> row positions, built once per uploaded file instead of scanned per lookup."""
+    # Keyed on the cheap upload identity (the frame itself is not hashed); cache_resource returns
+    # the dict as-is rather than unpickling a copy on every hit. Callers must not mutate it.
+    keys = _df["Email"].astype(str).str.lower()
+    return keys.groupby(keys).indices
+
+LINK_REPLACEMENT = r'<a href="\2" style="color:#1a73e8; text-decoration:underline;" target="_blank">\1</a>'
+HTML_HEAD = """
+    <html><body style="font-family: 'Google Sans', Arial, sans-serif; font-size: 14px; line-height: 1.6;">
+        """
+HTML_TAIL = """
+    </body></html>
+    """
 
 def convert_bold(text):
     if not text:
         return ""
-    text = re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", text)
-    text = re.sub(
-        r"\[(.*?)\]\((https?://[^\s)]+)\)",
-        r'<a href="\2" style="color:#1a73e8; text-decoration:underline;" target="_blank">\1</a>',
-        text,
-    )
+    text = BOLD_RE.sub(r"<b>\1</b>", text)
+    text = LINK_RE.sub(LINK_REPLACEMENT, text)
     text = text.replace("\n", "<br>").replace("  ", "&nbsp;&nbsp;")
-    return f"""
-    <html><body style="font-family: 'Google Sans', Arial, sans-serif; font-size: 14px; line-height: 1.6;">
-        {text}
-    </body></html>
-    """
+    return HTML_HEAD + text + HTML_TAIL
+
+def convert_bold_series(texts):
+    """Column-wise convert_bold: the same markdown-to-HTML pass over a whole Series at once."""
+    html = (
+        texts.str.replace(BOLD_RE, r"<b>\1</b>", regex=True)
+        .str.replace(LINK_RE, LINK_REPLACEMENT, regex=True)
+        .str.replace("\n", "<br>", regex=False)
+        .str.replace("  ", "&nbsp;&nbsp;", regex=False)
+    )
+    return (HTML_HEAD + html + HTML_TAIL).where(texts != "", "")
+
+def template_fields(*templates):
+    """Column names the templates' placeholders read, e.g. "First Name" for {First Name[0]}."""
+    fields = []
+    for template in templates:
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field is not None:
+                name = re.match(r"[^.\[]*", field).group(0)
+                if name not in fields:
+                    fields.append(name)
+    return fields
+
+@functools.lru_cache(maxsize=1024)
+def render_row(template, items):
+    """str.format for one row, memoized on its placeholder values so rows sharing them render once."""
+    return template.format(**dict(items))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_preview(subject_template, body_template, items):
+    # Module-level caches are rebuilt on every rerun; st.cache_data is what survives between them
+    return render_row(subject_template, items), convert_bold(render_row(body_template, items))
+
+def render_template(frame, template):
+    """Fill {Column} placeholders for every row of `frame` at once; raises KeyError for unknown columns."""
+    # Parse the template once, then build the result by concatenating literal text and whole columns
+    parts = list(string.Formatter().parse(template))
+    # Format specs, conversions and index/attribute fields like {First Name[0]} need real str.format
+    if any(spec or conversion or (field is not None and field not in frame.columns)
+           for _, field, spec, conversion in parts):
+        # Key on the placeholder values only, so rows that differ just in Email/Status still hit the cache
+        fields = template_fields(template)
+        return frame.apply(lambda row: render_row(template, tuple((f, row[f]) for f in fields)), axis=1)
+    rendered = pd.Series("", index=frame.index, dtype=object)
+    for literal, field, _, _ in parts:
+        rendered = rendered + literal
+        if field is not None:
+            rendered = rendered + frame[field].astype(str)
+    return rendered
+
+def encode_header_value(value):
+    value = " ".join(str(value).splitlines())  # a subject line break must never start a new header
+    return value if value.isascii() else Header(value, "utf-8").encode()
+
+def checked_header_value(name, value):
+    # Address and Message-ID headers can't be flattened safely, so reject line breaks outright
+    value = str(value)
+    if "\r" in value or "\n" in value:
+        raise ValueError(f"{name} header value contains a line break: {value!r}")
+    return value
+
+def build_raw_message(to_addr, subject, body_html, message_id, reply_to=None):
+    """Gmail `raw` payload for an HTML email, assembled directly instead of through the MIME generator."""
+    headers = [
+        f"To: {checked_header_value('To', to_addr)}",
+        f"Subject: {encode_header_value(subject)}",
+        f"Message-ID: {message_id}",
+    ]
+    if reply_to:
+        reply_to = checked_header_value("In-Reply-To", reply_to)
+        headers += [f"In-Reply-To: {reply_to}", f"References: {reply_to}"]
+    headers += [
+        "MIME-Version: 1.0",
+        'Content-Type: text/html; charset="utf-8"',
+        "Content-Transfer-Encoding: base64",
+    ]
+    # base64 body keeps every line under the RFC 5322 limit, which a one-line HTML body would exceed as 8bit
+    msg_bytes = ("\n".join(headers) + "\n\n").encode("ascii") + base64.encodebytes(body_html.encode("utf-8"))
+    return base64.urlsafe_b64encode(msg_bytes).decode("ascii")
+
+def is_retryable(exc, statuses=RETRYABLE_STATUSES):
+    """Rate-limit and server errors from either the client library or the raw aiohttp path."""
+    if isinstance(exc, HttpError):
+        return exc.resp.status in statuses
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in statuses
+    return False
+
+def retry_after_seconds(exc):
+    if isinstance(exc, HttpError):
+        value = exc.resp.get("retry-after")
+    elif isinstance(exc, aiohttp.ClientResponseError) and exc.headers:
+        value = exc.headers.get("Retry-After")
+    else:
+        value = None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
-def get_or_create_label(service, label_name="Mail Merge Sent"):
+_exponential_backoff = wait_exponential(min=1, max=60)
+
+def wait_for_gmail(retry_state):
+    # Exponential backoff, but never sooner than a Retry-After the server asked for
+    backoff = _exponential_backoff(retry_state)
+    retry_after = retry_after_seconds(retry_state.outcome.exception())
+    return max(backoff, retry_after) if retry_after else backoff
+
+gmail_retry = retry(
+    retry=retry_if_exception(is_retryable),
+    stop=stop_after_attempt(GMAIL_MAX_ATTEMPTS),
+    wait=wait_for_gmail,
+    reraise=True,
+)
+
+gmail_read_retry = retry(
+    retry=retry_if_exception(lambda exc: is_retryable(exc, READ_RETRYABLE_STATUSES)),
+    stop=stop_after_attempt(GMAIL_MAX_ATTEMPTS),
+    wait=wait_for_gmail,
+    reraise=True,
+)
+
+@gmail_retry
+def execute_request(request):
+    return request.execute()
+
+@gmail_read_retry
+def execute_read(request):
+    return request.execute()
+
+def get_gmail_client(creds_json: str):
+    """(creds, service) for this browser session; the service authenticates with that same creds object."""
+    # One client per browser session, kept in session_state across reruns. httplib2 connections
+    # aren't thread-safe, so two tabs (two script threads) must never share one.
+    # static_discovery uses the Gmail discovery doc bundled with googleapiclient, and every call
+    # (batches included) goes through the same Http so its keep-alive connection is reused.
+    info = json.loads(creds_json)
+    # Keyed on the refresh token, so refresh_if_stale rewriting the stored JSON keeps this client
+    key = info.get("refresh_token") or creds_json
+    cached = st.session_state.get("gmail_client")
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+    creds = Credentials.from_authorized_user_info(info, SCOPES)
+    # build_http() applies googleapiclient's default socket timeout, so a stalled call can't hang the run
+    authed_http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+    service = build("gmail", "v1", http=authed_http, cache_discovery=False, static_discovery=True)
+    st.session_state["gmail_client"] = (key, creds, service)
+    return creds, service
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_label_id(creds_json: str, label_name: str, _service):
+    # Raises on failure so an API error is never cached as a missing label
+    service = _service
+    labels = execute_read(service.users().labels().list(userId="me")).get("labels", [])
+    for label in labels:
+        if label["name"].lower() == label_name.lower():
+            return label["id"]
+    created_label = execute_request(service.users().labels().create(
+        userId="me",
+        body={"name": label_name, "labelListVisibility": "labelShow", "messageListVisibility": "show"},
+    ))
+    return created_label["id"]
+
+def get_or_create_label(service, creds_json, label_name="Mail Merge Sent"):
     try:
-        labels = service.users().labels().list(userId="me").execute().get("labels", [])
-        for label in labels:
-            if label["name"].lower() == label_name.lower():
-                return label["id"]
-        created_label = service.users().labels().create(
-            userId="me",
-            body={"name": label_name, "labelListVisibility": "labelShow", "messageListVisibility": "show"},
-        ).execute()
-        return created_label["id"]
+        return cached_label_id(creds_json, label_name, service)
     except Exception:
         return None
 
-def send_email_backup(service, csv_path):
+def send_email_backup(service, csv_path, csv_bytes):
+    """Email the CSV to the signed-in user; returns (ok, message) so it can run off the script thread."""
     try:
-        user_email = service.users().getProfile(userId="me").execute()["emailAddress"]
+        user_email = execute_read(service.users().getProfile(userId="me"))["emailAddress"]
         msg = MIMEMultipart()
         msg["To"] = user_email
         msg["From"] = user_email
         msg["Subject"] = f"📁 Mail Merge Backup CSV - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         msg.attach(MIMEText("Attached is the backup CSV for your mail merge run.", "plain"))
-        with open(csv_path, "rb") as f:
-            part = MIMEApplication(f.read(), Name=os.path.basename(csv_path))
+        part = MIMEApplication(csv_bytes, Name=os.path.basename(csv_path))
         part["Content-Disposition"] = f'attachment; filename="{os.path.basename(csv_path)}"'
         msg.attach(part)
         raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-        service.users().messages().send(userId="me", body={"raw": raw}).execute()
-        st.info(f"📧 Backup CSV emailed to {user_email}")
+        execute_request(service.users().messages().send(userId="me", body={"raw": raw}))
+        return True, f"📧 Backup CSV emailed to {user_email}"
     except Exception as e:
-        st.warning(f"⚠️ Could not send backup email: {e}")
+        return False, f"⚠️ Could not send backup email: {e}"
+
+@st.cache_resource(show_spinner=False)
+def background_executor():
+    # One pool for the whole server, so it outlives the rerun that submitted the work
+    return ThreadPoolExecutor(max_workers=2)
+
+def save_and_backup(csv_bytes, file_path, creds_json):
+    with open(file_path, "wb") as f:
+        f.write(csv_bytes)
+    try:
+        with open(DONE_FILE, "w") as f:
+            json.dump({"done_time": str(datetime.now()), "file": file_path}, f)
+    except Exception:
+        pass
+    # A private client: httplib2 connections must not be shared with the script thread
+    creds = Credentials.from_authorized_user_info(json.loads(creds_json), SCOPES)
+    backup_service = build("gmail", "v1", credentials=creds, cache_discovery=False, static_discovery=True)
+    return send_email_backup(backup_service, file_path, csv_bytes)
+
+class SendPacer:
+    """Token bucket on the monotonic clock: only sleeps when calls run ahead of one per `delay` seconds."""
 
-def fetch_message_id_header(service, message_id):
-    for _ in range(6):
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_slot = time.monotonic()
+
+    def reserve(self, count=1):
+        """Claim the next slot for `count` items; returns how long to wait before using it."""
+        now = time.monotonic()
+        start = max(now, self.next_slot)
+        self.next_slot = start + random.uniform(self.delay * 0.9, self.delay * 1.1) * count
+        return start - now
+
+    def wait(self, count=1):
+        time.sleep(self.reserve(count))
+
+def execute_batch(service, requests):
+    """Run (request_id, request) pairs as one Gmail batch; returns {request_id: (response, exception)}.
+
+    Subrequests that fail with a retryable status are re-batched with backoff.
+    """
+    results = {}
+
+    def _collect(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    pending = list(requests)
+    for attempt in range(GMAIL_MAX_ATTEMPTS):
+        batch = service.new_batch_http_request(callback=_collect)
+        for request_id, request in pending:
+            batch.add(request, request_id=request_id)
         try:
-            msg_detail = service.users().messages().get(
-                userId="me", id=message_id, format="metadata", metadataHeaders=["Message-ID"]
-            ).execute()
-            headers = msg_detail.get("payload", {}).get("headers", [])
-            for h in headers:
-                if h.get("name", "").lower() == "message-id":
-                    return h.get("value")
-        except Exception:
-            pass
-        time.sleep(random.uniform(1, 2))
-    return ""
+            batch.execute()
+        except Exception as e:
+            for request_id, _ in pending:
+                results[request_id] = (None, e)
+
+        pending = [(rid, req) for rid, req in pending if is_retryable(results[rid][1])]
+        if not pending or attempt == GMAIL_MAX_ATTEMPTS - 1:
+            break
+        retry_after = max((retry_after_seconds(results[rid][1]) or 0) for rid, _ in pending)
+        time.sleep(max(min(2 ** attempt, 60), retry_after))
+    return results
+
+def refresh_if_stale(creds, skew=TOKEN_REFRESH_SKEW):
+    """Refresh the access token shortly before it expires instead of on the first failing call."""
+    if not creds.refresh_token:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth keeps expiry as naive UTC
+    if not creds.token or (creds.expiry and creds.expiry - now < skew):
+        creds.refresh(Request())
+        st.session_state["creds"] = creds.to_json()
+
+@gmail_retry
+async def send_one(session, sem, pacer, msg_body, creds):
+    async with sem:
+        # Same jittered spacing as the draft path; each retry attempt claims a fresh slot
+        await asyncio.sleep(pacer.reserve())
+        # A paced run can outlast the one-hour access token, so check right before each send
+        refresh_if_stale(creds)
+        headers = {"Authorization": f"Bearer {creds.token}"}
+        async with session.post(GMAIL_SEND_URL, json=msg_body, headers=headers) as r:
+            if r.status >= 400:
+                # Front-end 5xx pages are HTML, so the status must be classified before any JSON parsing
+                text = await r.text(errors="replace")
+                try:
+                    message = json.loads(text)["error"]["message"]
+                except (ValueError, KeyError, TypeError):
+                    message = r.reason
+                raise aiohttp.ClientResponseError(
+                    r.request_info, r.history, status=r.status, headers=r.headers, message=message,
+                )
+            return await r.json(content_type=None)
+
+async def send_all(msg_bodies, creds, delay, on_done=None):
+    """Send prepared message bodies concurrently; results (or exceptions) come back in input order."""
+    sem = asyncio.Semaphore(SEND_CONCURRENCY)
+    pacer = SendPacer(delay)
+    finished = 0
+
+    # aiohttp drops idle connections after 15s by default, shorter than any send delay; keep the
+    # connection open across the pacing gap so the whole run shares one TLS handshake
+    connector = aiohttp.TCPConnector(limit_per_host=SEND_CONCURRENCY, keepalive_timeout=delay * 2)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def _tracked(msg_body):
+            nonlocal finished
+            try:
+                result = await send_one(session, sem, pacer, msg_body, creds)
+            except Exception as e:
+                result = e
+            finished += 1
+            if on_done:
+                on_done(finished)
+            return result
+
+        # Only per-send errors are captured as results. Streamlit's Stop/Rerun signals raised by
+        # on_done are BaseExceptions: they propagate out of gather and asyncio.run cancels the rest.
+        return await asyncio.gather(*[_tracked(b) for b in msg_bodies])
 
 # ========================================
 # OAuth Flow
@@ -234,14 +525,19 @@ else:
         st.session_state["creds"] = creds.to_json()
         st.rerun()
     else:
-        flow = Flow.from_client_config(CLIENT_CONFIG, scopes=SCOPES)
-        flow.redirect_uri = st.secrets["gmail"]["redirect_uri"]
-        auth_url, _ = flow.authorization_url(prompt="consent", access_type="offline", include_granted_scopes="true")
+        # Build the flow and sign the URL once per session rather than on every rerun; the flow
+        # itself isn't kept because the redirect back from Google arrives in a new session
+        if "auth_url" not in st.session_state:
+            flow = Flow.from_client_config(CLIENT_CONFIG, scopes=SCOPES)
+            flow.redirect_uri = st.secrets["gmail"]["redirect_uri"]
+            st.session_state["auth_url"], _ = flow.authorization_url(
+                prompt="consent", access_type="offline", include_granted_scopes="true"
+            )
+        auth_url = st.session_state["auth_url"]
         st.markdown(f"### 🔑 Please [authorize the app]({auth_url}) to send emails using your Gmail account.")
         st.stop()
 
-creds = Credentials.from_authorized_user_info(json.loads(st.session_state["creds"]), SCOPES)
-service = build("gmail", "v1", credentials=creds)
+creds, service = get_gmail_client(st.session_state["creds"])
 
 # ========================================
 # Session Setup
@@ -260,15 +556,15 @@ if not st.session_state["sending"]:
     uploaded_file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"])
 
     if uploaded_file:
-        # Safe CSV reading with encoding fallback
+        # Safe CSV reading with encoding fallback; everything stays text so IDs/phones keep their digits
         if uploaded_file.name.lower().endswith("csv"):
             try:
-                df = pd.read_csv(uploaded_file, encoding="utf-8")
+                df = pd.read_csv(uploaded_file, encoding="utf-8", dtype=str, keep_default_na=False)
             except UnicodeDecodeError:
                 uploaded_file.seek(0)
-                df = pd.read_csv(uploaded_file, encoding="latin1")
+                df = pd.read_csv(uploaded_file, encoding="latin1", dtype=str, keep_default_na=False)
         else:
-            df = pd.read_excel(uploaded_file)
+            df = pd.read_excel(uploaded_file, engine="openpyxl", dtype=str, keep_default_na=False)
 
         for col in ["ThreadId", "RfcMessageId", "Status"]:
             if col not in df.columns:
@@ -281,8 +577,10 @@ if not st.session_state["sending"]:
             search_email = st.text_input("Enter email to search:", key="email_search_box")
             if st.button("Search Email", key="email_search_button"):
                 if "Email" in df.columns:
-                    result = df[df["Email"].astype(str).str.lower() == search_email.lower()]
-                    if not result.empty:
+                    upload_key = (uploaded_file.name, uploaded_file.size, getattr(uploaded_file, "file_id", None))
+                    positions = email_index(upload_key, df).get(search_email.lower())
+                    if positions is not None:
+                        result = df.iloc[positions]
                         st.success("✅ Email found.")
                         st.dataframe(result)
                     else:
@@ -336,8 +634,8 @@ Thanks,
         if not df.empty:
             preview_row = df.iloc[0]
             try:
-                preview_subject = subject_template.format(**preview_row)
-                preview_body = convert_bold(body_template.format(**preview_row))
+                preview_items = tuple((f, preview_row[f]) for f in template_fields(subject_template, body_template))
+                preview_subject, preview_body = render_preview(subject_template, body_template, preview_items)
             except Exception as e:
                 preview_subject = subject_template
                 preview_body = body_template
@@ -382,106 +680,152 @@ if st.session_state["sending"]:
     progress = st.progress(0)
     eta_text = st.empty()
 
+    # Refresh up-front so neither the API client nor the aiohttp path pays for it mid-run
+    refresh_if_stale(creds)
     label_id = None
     if send_mode == "🆕 New Email":
-        label_id = get_or_create_label(service, label_name)
+        label_id = get_or_create_label(service, st.session_state["creds"], label_name)
 
-    total = len(pending_indices)
-    sent_count, skipped, errors = 0, [], []
-    batch_count = 0
+    sent_count, errors = 0, []
     sent_message_ids = []
+    batch_limit = DRAFT_BATCH_SIZE_DEFAULT if send_mode == "💾 Save as Draft" else BATCH_SIZE_DEFAULT
+
+    # Results are collected in plain lists (df has a RangeIndex) and written back as whole columns
+    status_col = df["Status"].tolist()
+    thread_col = df["ThreadId"].tolist()
+    rfc_col = df["RfcMessageId"].tolist()
+
+    # --- Extract every recipient address in one pass; rows without one are skipped up-front ---
+    emails = df["Email"] if "Email" in df.columns else pd.Series("", index=df.index)
+    to_addrs = extract_emails(emails.loc[pending_indices])
+    skipped_mask = to_addrs.isna()
+    skipped = emails.loc[to_addrs.index[skipped_mask]].tolist()
+    for idx in to_addrs.index[skipped_mask]:
+        status_col[idx] = "Skipped"
+    pending_indices = to_addrs.index[~skipped_mask].tolist()
+
+    # --- Build every raw message up-front so each chunk ships as one batch ---
+    jobs = []
+    render_error = None
+    try:
+        pending_rows = df.loc[pending_indices]
+        subjects = render_template(pending_rows, subject_template)
+        bodies = convert_bold_series(render_template(pending_rows, body_template))
+    except Exception as e:
+        render_error = e
 
-    for i, idx in enumerate(pending_indices):
-        batch_limit = DRAFT_BATCH_SIZE_DEFAULT if send_mode == "💾 Save as Draft" else BATCH_SIZE_DEFAULT
-        if batch_count >= batch_limit:
+    # Plain tuples of just the reply columns; no per-row Series is built
+    reply_cols = df.loc[pending_indices, ["ThreadId", "RfcMessageId"]].astype(str)
+    for idx, thread_id, rfc_id in reply_cols.itertuples(index=True, name=None):
+        if len(jobs) >= batch_limit:
             break
 
-        row = df.loc[idx]
+        to_addr = to_addrs[idx]
+        try:
+            if render_error is not None:
+                raise render_error
+            # Our own Message-ID is kept by Gmail, so no follow-up GET is needed to learn it
+            message_id = make_msgid(domain=MESSAGE_ID_DOMAIN)
 
-        pct = int(((i + 1) / total) * 100)
+            thread_id = thread_id.strip()
+            rfc_id = rfc_id.strip()
+            if thread_id and rfc_id:
+                raw = build_raw_message(to_addr, subjects[idx], bodies[idx], message_id, reply_to=rfc_id)
+                msg_body = {"raw": raw, "threadId": thread_id}
+            else:
+                raw = build_raw_message(to_addr, subjects[idx], bodies[idx], message_id)
+                msg_body = {"raw": raw}
+            jobs.append((idx, to_addr, msg_body, message_id))
+        except Exception as e:
+            status_col[idx] = "Error"
+            errors.append((to_addr, str(e)))
+            st.error(f"❌ Error for {to_addr}: {e}")
+
+    total = len(jobs)
+    status_box = st.empty()
+
+    def show_progress(done_count):
+        pct = int((done_count / total) * 100) if total else 100
         progress.progress(min(max(pct, 0), 100))
 
         # --- ETA calculation ---
         elapsed = time.time() - start_time
-        avg_per_email = elapsed / (i + 1) if i + 1 > 0 else 0
-        remaining = total - (i + 1)
+        avg_per_email = elapsed / done_count if done_count > 0 else delay
+        remaining = total - done_count
         est_seconds = int(avg_per_email * remaining)
         eta_str = str(timedelta(seconds=est_seconds))
-        eta_text.info(f"⏳ Est. Time Remaining: {eta_str} ({i + 1}/{total})")
-
-        status_box = st.empty()
-        status_box.info(f"📩 Processing {i + 1}/{total}")
-
-        to_addr = extract_email(str(row.get("Email", "")).strip())
-        if not to_addr:
-            skipped.append(row.get("Email"))
-            df.loc[idx, "Status"] = "Skipped"
-            continue
-
-        try:
-            subject = subject_template.format(**row)
-            body_html = convert_bold(body_template.format(**row))
-            message = MIMEText(body_html, "html")
-            message["To"] = to_addr
-            message["Subject"] = subject
-
-            msg_body = {}
-            thread_id = str(row.get("ThreadId", "")).strip()
-            rfc_id = str(row.get("RfcMessageId", "")).strip()
-            if thread_id and rfc_id:
-                message["In-Reply-To"] = rfc_id
-                message["References"] = rfc_id
-                raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-                msg_body = {"raw": raw, "threadId": thread_id}
-            else:
-                raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-                msg_body = {"raw": raw}
+        eta_text.info(f"⏳ Est. Time Remaining: {eta_str} ({done_count}/{total})")
+
+    if send_mode == "💾 Save as Draft":
+        pacer = SendPacer(delay)
+        for start in range(0, total, SEND_CHUNK_SIZE):
+            chunk = jobs[start:start + SEND_CHUNK_SIZE]
+            done_count = start + len(chunk)
+            show_progress(done_count)
+            status_box.info(f"📩 Processing {start + 1}–{done_count}/{total}")
+            pacer.wait(len(chunk))
+            refresh_if_stale(creds)  # a draft run can outlast the one-hour token
+
+            results = execute_batch(service, [
+                (str(idx), service.users().drafts().create(userId="me", body={"message": msg_body}))
+                for idx, _, msg_body, _ in chunk
+            ])
+            for idx, to_addr, _, _ in chunk:
+                _, exc = results.get(str(idx), (None, Exception("No response in batch")))
+                if exc is not None:
+                    status_col[idx] = "Error"
+                    errors.append((to_addr, str(exc)))
+                    st.error(f"❌ Error for {to_addr}: {exc}")
+                    continue
+                status_col[idx] = "Draft"
+                sent_count += 1
+    else:
+        # --- Sends overlap on one aiohttp session; SendPacer spaces them ~`delay` apart ---
+        status_box.info(f"📩 Sending {total} emails...")
+        responses = asyncio.run(
+            send_all([msg_body for _, _, msg_body, _ in jobs], creds, delay, on_done=show_progress)
+        )
 
-            if send_mode == "💾 Save as Draft":
-                service.users().drafts().create(userId="me", body={"message": msg_body}).execute()
-                df.loc[idx, "Status"] = "Draft"
-            else:
-                sent_msg = service.users().messages().send(userId="me", body=msg_body).execute()
-                msg_id = sent_msg.get("id", "")
-                df.loc[idx, "ThreadId"] = sent_msg.get("threadId", "")
-                df.loc[idx, "RfcMessageId"] = fetch_message_id_header(service, msg_id) or msg_id
-                df.loc[idx, "Status"] = "Sent"
-                if send_mode == "🆕 New Email" and label_id:
-                    sent_message_ids.append(msg_id)
-
-            time.sleep(random.uniform(delay * 0.9, delay * 1.1))
+        for (idx, to_addr, _, message_id), response in zip(jobs, responses):
+            if isinstance(response, BaseException):
+                status_col[idx] = "Error"
+                errors.append((to_addr, str(response)))
+                st.error(f"❌ Error for {to_addr}: {response}")
+                continue
+            status_col[idx] = "Sent"
+            thread_col[idx] = response.get("threadId", "")
+            rfc_col[idx] = message_id
             sent_count += 1
-            batch_count += 1
-        except Exception as e:
-            df.loc[idx, "Status"] = "Error"
-            errors.append((to_addr, str(e)))
-            st.error(f"❌ Error for {to_addr}: {e}")
+            if send_mode == "🆕 New Email" and label_id:
+                sent_message_ids.append(response["id"])
+
+    df["Status"] = status_col
+    df["ThreadId"] = thread_col
+    df["RfcMessageId"] = rfc_col
 
     # Label + Backup
     if send_mode != "💾 Save as Draft" and sent_message_ids and label_id:
-        try:
-            service.users().messages().batchModify(
-                userId="me",
-                body={"ids": sent_message_ids, "addLabelIds": [label_id]}
-            ).execute()
-        except Exception as e:
-            st.warning(f"⚠️ Labeling failed: {e}")
+        refresh_if_stale(creds)
+        for start in range(0, len(sent_message_ids), BATCH_MODIFY_MAX_IDS):
+            try:
+                execute_request(service.users().messages().batchModify(
+                    userId="me",
+                    body={"ids": sent_message_ids[start:start + BATCH_MODIFY_MAX_IDS], "addLabelIds": [label_id]}
+                ))
+            except Exception as e:
+                st.warning(f"⚠️ Labeling failed: {e}")
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_label = re.sub(r'[^A-Za-z0-9_-]', '_', label_name)
     file_name = f"Updated_{safe_label}_{timestamp}.csv"
     file_path = os.path.join("/tmp", file_name)
-    df.to_csv(file_path, index=False)
-    try:
-        send_email_backup(service, file_path)
-    except Exception as e:
-        st.warning(f"⚠️ Backup email failed: {e}")
-
-    try:
-        with open(DONE_FILE, "w") as f:
-            json.dump({"done_time": str(datetime.now()), "file": file_path}, f)
-    except Exception:
-        pass
+    # Serialize once in memory: the bytes feed the download button, the file copy and the backup email
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+    st.session_state["last_saved_bytes"] = csv_bytes
+    st.session_state["last_saved_path"] = file_path
+    st.session_state["backup_fut"] = background_executor().submit(
+        save_and_backup, csv_bytes, file_path, st.session_state["creds"]
+    )
 
     st.session_state["sending"] = False
     st.session_state["done"] = True
@@ -499,6 +843,26 @@ if st.session_state["done"]:
         st.error(f"❌ {len(summary['errors'])} errors occurred.")
     if summary.get("skipped"):
         st.warning(f"⚠️ Skipped: {summary['skipped']}")
+
+    backup_fut = st.session_state.get("backup_fut")
+    if backup_fut is not None:
+        if not backup_fut.done():
+            st.info("⏳ Backup pending...")
+            st.button("🔄 Refresh backup status")
+        elif backup_fut.exception() is not None:
+            st.warning(f"⚠️ Backup email failed: {backup_fut.exception()}")
+        else:
+            ok, message = backup_fut.result()
+            (st.info if ok else st.warning)(message)
+
+    if st.session_state.get("last_saved_bytes"):
+        st.download_button(
+            "⬇️ Download Updated CSV",
+            data=st.session_state["last_saved_bytes"],
+            file_name=os.path.basename(st.session_state["last_saved_path"]),
+            mime="text/csv",
+        )
+
     if st.button("🔁 New Run / Reset"):
         if os.path.exists(DONE_FILE):
             os.remove(DONE_FILE)